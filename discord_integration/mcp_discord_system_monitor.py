@@ -9,7 +9,9 @@ import requests
 import json
 import time
 import os
+import sys
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import schedule
 import logging
@@ -29,6 +31,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Discord 報告範本 (模組載入時建立一次，每次報告只需填入數值)
+REPORT_TEMPLATE = """🤖 **MCP 系統監控報告** - {timestamp}
+
+{cpu_status} **CPU 使用率**: {cpu_percent:.1f}% ({cpu_count} 核心)
+{mem_status} **記憶體**: {mem_used_gb:.1f}GB / {mem_total_gb:.1f}GB ({mem_percent:.1f}%)
+{disk_status} **磁碟空間**: {disk_used_gb:.1f}GB / {disk_total_gb:.1f}GB ({disk_percent:.1f}%)
+
+📊 **系統負載**: {load_1:.2f}, {load_5:.2f}, {load_15:.2f}
+⏰ **運行時間**: {uptime}
+🔄 **進程數**: {processes}
+🌐 **網路連線**: {connections}
+📡 **網路流量**: ↑{net_sent_mb:.1f}MB ↓{net_recv_mb:.1f}MB
+
+🛠️ **MCP 服務狀態**:
+{web_status} Web 儀表板 (Port 8003)
+{apache_status} Apache 反向代理
+🔧 MCP Servers: {mcp_servers} 個進程運行中
+
+📈 **監控網址**: https://bao.mengwei710.com/"""
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# 同一輪 run_pending 中多個排程同時到期 (例如 09:00 的整點與每日排程) 時只發送一次；
+# 只涵蓋連續執行的這幾秒，不影響各排程原本的間隔
+REPORT_DEDUP_WINDOW = 10
+
+# 服務狀態檢查命令: 檢查項目 -> 命令
+SERVICE_CHECK_COMMANDS = {
+    'web_server': ['netstat', '-ln'],
+    'apache': ['systemctl', 'is-active', 'apache2'],
+    'mcp_servers': ['ps', 'aux']
+}
+
+# CPU 核心數在執行期間不會改變，啟動時讀取一次
+CPU_COUNT = psutil.cpu_count()
+
+GB = 1024 ** 3
+MB = 1024 ** 2
+
+def usage_status(percent):
+    """依使用率回傳狀態指示器"""
+    if percent < 80:
+        return "🟢"
+    if percent < 95:
+        return "🟡"
+    return "🔴"
+
 class MCPDiscordMonitor:
     def __init__(self):
         self.discord_token = os.getenv('DISCORD_TOKEN')
@@ -39,6 +87,16 @@ class MCPDiscordMonitor:
         if not self.discord_token:
             raise ValueError("DISCORD_TOKEN 環境變數未設定")
         
+        # 重複使用同一個 HTTP Session，保留連線池避免每次發送都重新握手
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bot {self.discord_token}",
+            "Content-Type": "application/json"
+        })
+        
+        # 上次成功發送報告的時間 (time.monotonic)
+        self.last_report_time = None
+        
         logger.info("MCP Discord 監控器已初始化")
         logger.info(f"Guild ID: {self.guild_id}")
         logger.info(f"Channel ID: {self.channel_id}")
@@ -48,7 +106,7 @@ class MCPDiscordMonitor:
         try:
             # CPU 資訊
             cpu_percent = psutil.cpu_percent(interval=1)
-            cpu_count = psutil.cpu_count()
+            cpu_count = CPU_COUNT
             cpu_freq = psutil.cpu_freq()
             
             # 記憶體資訊
@@ -125,25 +183,37 @@ class MCPDiscordMonitor:
             'mcp_servers': 0
         }
         
-        try:
-            # 檢查 Web 服務 (port 8003)
-            result = subprocess.run(['netstat', '-ln'], capture_output=True, text=True)
-            if ':8003' in result.stdout:
-                services['web_server'] = True
-            
-            # 檢查 Apache
-            result = subprocess.run(['systemctl', 'is-active', 'apache2'], 
-                                  capture_output=True, text=True)
-            if result.stdout.strip() == 'active':
-                services['apache'] = True
-            
-            # 檢查 MCP 相關進程
-            result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
-            mcp_count = result.stdout.count('mcp_') + result.stdout.count('mcp-')
-            services['mcp_servers'] = mcp_count
-            
-        except Exception as e:
-            logger.error(f"檢查服務狀態時發生錯誤: {e}")
+        # 三個檢查命令同時啟動，總耗時約為最慢的一個而非三者相加；
+        # 每個命令各自處理錯誤，單一命令失敗不影響其他檢查結果
+        running = {}
+        for check, command in SERVICE_CHECK_COMMANDS.items():
+            try:
+                running[check] = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                                  stderr=subprocess.PIPE, text=True)
+            except Exception as e:
+                logger.error(f"檢查服務狀態時發生錯誤 ({check}): {e}")
+        
+        # 已啟動的命令一律讀取輸出並回收，避免留下殭屍進程
+        outputs = {}
+        for check, proc in running.items():
+            try:
+                outputs[check] = proc.communicate()[0]
+            except Exception as e:
+                proc.kill()
+                proc.wait()
+                logger.error(f"檢查服務狀態時發生錯誤 ({check}): {e}")
+        
+        # 檢查 Web 服務 (port 8003)
+        if ':8003' in outputs.get('web_server', ''):
+            services['web_server'] = True
+        
+        # 檢查 Apache
+        if outputs.get('apache', '').strip() == 'active':
+            services['apache'] = True
+        
+        # 檢查 MCP 相關進程
+        ps_output = outputs.get('mcp_servers', '')
+        services['mcp_servers'] = ps_output.count('mcp_') + ps_output.count('mcp-')
         
         return services
     
@@ -152,44 +222,39 @@ class MCPDiscordMonitor:
         if not metrics:
             return "❌ 系統指標收集失敗"
         
-        timestamp = metrics['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 狀態指示器
-        cpu_status = "🟢" if metrics['cpu']['percent'] < 80 else "🟡" if metrics['cpu']['percent'] < 95 else "🔴"
-        mem_status = "🟢" if metrics['memory']['percent'] < 80 else "🟡" if metrics['memory']['percent'] < 95 else "🔴"
-        disk_status = "🟢" if metrics['disk']['percent'] < 80 else "🟡" if metrics['disk']['percent'] < 95 else "🔴"
-        
-        # 格式化記憶體和磁碟大小
-        mem_used_gb = metrics['memory']['used'] / (1024**3)
-        mem_total_gb = metrics['memory']['total'] / (1024**3)
-        disk_used_gb = metrics['disk']['used'] / (1024**3)
-        disk_total_gb = metrics['disk']['total'] / (1024**3)
+        cpu = metrics['cpu']
+        memory = metrics['memory']
+        disk = metrics['disk']
+        system = metrics['system']
+        network = metrics['network']
+        load_avg = system['load_avg']
         
-        # 格式化運行時間
-        uptime_str = str(metrics['system']['uptime']).split('.')[0]
-        
-        # 網路流量 (MB)
-        net_sent_mb = metrics['network']['bytes_sent'] / (1024**2)
-        net_recv_mb = metrics['network']['bytes_recv'] / (1024**2)
-        
-        report = f"""🤖 **MCP 系統監控報告** - {timestamp}
-
-{cpu_status} **CPU 使用率**: {metrics['cpu']['percent']:.1f}% ({metrics['cpu']['count']} 核心)
-{mem_status} **記憶體**: {mem_used_gb:.1f}GB / {mem_total_gb:.1f}GB ({metrics['memory']['percent']:.1f}%)
-{disk_status} **磁碟空間**: {disk_used_gb:.1f}GB / {disk_total_gb:.1f}GB ({metrics['disk']['percent']:.1f}%)
-
-📊 **系統負載**: {metrics['system']['load_avg'][0]:.2f}, {metrics['system']['load_avg'][1]:.2f}, {metrics['system']['load_avg'][2]:.2f}
-⏰ **運行時間**: {uptime_str}
-🔄 **進程數**: {metrics['system']['processes']}
-🌐 **網路連線**: {metrics['network']['connections']}
-📡 **網路流量**: ↑{net_sent_mb:.1f}MB ↓{net_recv_mb:.1f}MB
-
-🛠️ **MCP 服務狀態**:
-{'✅' if services['web_server'] else '❌'} Web 儀表板 (Port 8003)
-{'✅' if services['apache'] else '❌'} Apache 反向代理
-🔧 MCP Servers: {services['mcp_servers']} 個進程運行中
-
-📈 **監控網址**: https://bao.mengwei710.com/"""
+        report = REPORT_TEMPLATE.format(
+            timestamp=metrics['timestamp'].strftime(TIMESTAMP_FORMAT),
+            cpu_status=usage_status(cpu['percent']),
+            cpu_percent=cpu['percent'],
+            cpu_count=cpu['count'],
+            mem_status=usage_status(memory['percent']),
+            mem_used_gb=memory['used'] / GB,
+            mem_total_gb=memory['total'] / GB,
+            mem_percent=memory['percent'],
+            disk_status=usage_status(disk['percent']),
+            disk_used_gb=disk['used'] / GB,
+            disk_total_gb=disk['total'] / GB,
+            disk_percent=disk['percent'],
+            load_1=load_avg[0],
+            load_5=load_avg[1],
+            load_15=load_avg[2],
+            # 格式化運行時間 (去除微秒)
+            uptime=str(system['uptime']).split('.')[0],
+            processes=system['processes'],
+            connections=network['connections'],
+            net_sent_mb=network['bytes_sent'] / MB,
+            net_recv_mb=network['bytes_recv'] / MB,
+            web_status='✅' if services['web_server'] else '❌',
+            apache_status='✅' if services['apache'] else '❌',
+            mcp_servers=services['mcp_servers']
+        )
         
         return report
     
@@ -197,15 +262,11 @@ class MCPDiscordMonitor:
         """發送訊息到 Discord"""
         try:
             url = f"{self.discord_api_base}/channels/{self.channel_id}/messages"
-            headers = {
-                "Authorization": f"Bot {self.discord_token}",
-                "Content-Type": "application/json"
-            }
             data = {
                 "content": message
             }
             
-            response = requests.post(url, headers=headers, json=data, timeout=10)
+            response = self.session.post(url, json=data, timeout=10)
             
             if response.status_code == 200:
                 message_data = response.json()
@@ -224,15 +285,20 @@ class MCPDiscordMonitor:
         """執行一次監控循環"""
         logger.info("開始監控循環")
         
-        # 收集系統指標
-        metrics = self.get_system_metrics()
+        # 服務狀態檢查 (外部命令) 在背景執行緒進行，與系統指標取樣 (CPU 取樣需等待 1 秒) 重疊
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            services_future = executor.submit(self.check_mcp_services)
+            
+            # 收集系統指標
+            metrics = self.get_system_metrics()
+            
+            # 檢查服務狀態
+            services = services_future.result()
+        
         if not metrics:
             logger.error("無法收集系統指標")
             return False
         
-        # 檢查服務狀態
-        services = self.check_mcp_services()
-        
         # 格式化報告
         report = self.format_system_report(metrics, services)
         
@@ -240,21 +306,30 @@ class MCPDiscordMonitor:
         success = self.send_to_discord(report)
         
         if success:
+            self.last_report_time = time.monotonic()
             logger.info("監控報告已發送到 Discord")
         else:
             logger.error("監控報告發送失敗")
         
         return success
     
+    def run_scheduled_cycle(self):
+        """排程觸發的監控循環，同一時刻重複觸發的排程只執行一次"""
+        if (self.last_report_time is not None
+                and time.monotonic() - self.last_report_time < REPORT_DEDUP_WINDOW):
+            logger.info("同一時刻已發送報告，略過重複的排程")
+            return False
+        return self.run_monitoring_cycle()
+    
     def start_scheduled_monitoring(self):
         """啟動排程監控"""
         logger.info("啟動排程監控")
         
         # 排程設定
-        schedule.every(15).minutes.do(self.run_monitoring_cycle)  # 每15分鐘
-        schedule.every().hour.at(":00").do(self.run_monitoring_cycle)  # 每小時整點
-        schedule.every().day.at("09:00").do(self.run_monitoring_cycle)  # 每天早上9點
-        schedule.every().day.at("18:00").do(self.run_monitoring_cycle)  # 每天晚上6點
+        schedule.every(15).minutes.do(self.run_scheduled_cycle)  # 每15分鐘
+        schedule.every().hour.at(":00").do(self.run_scheduled_cycle)  # 每小時整點
+        schedule.every().day.at("09:00").do(self.run_scheduled_cycle)  # 每天早上9點
+        schedule.every().day.at("18:00").do(self.run_scheduled_cycle)  # 每天晚上6點
         
         # 立即執行一次
         self.run_monitoring_cycle()
@@ -278,7 +353,6 @@ def main():
         monitor = MCPDiscordMonitor()
         
         # 檢查參數
-        import sys
         if len(sys.argv) > 1:
             if sys.argv[1] == "--once":
                 print("📊 執行單次監控...")
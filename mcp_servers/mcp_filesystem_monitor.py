@@ -10,6 +10,7 @@ import os
 import stat
 import time
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 from mcp.server import Server
 from mcp.types import Resource, Tool
@@ -20,6 +21,13 @@ app = Server("filesystem-monitor")
 # 從環境變數取得監控路徑
 WATCH_PATHS = os.environ.get("WATCH_PATHS", "/home,/var/log").split(",")
 
+# 權限位元對照表: (身分, ((動作, 權限位元), ...))
+PERMISSION_BITS = (
+    ("owner", (("read", stat.S_IRUSR), ("write", stat.S_IWUSR), ("execute", stat.S_IXUSR))),
+    ("group", (("read", stat.S_IRGRP), ("write", stat.S_IWGRP), ("execute", stat.S_IXGRP))),
+    ("others", (("read", stat.S_IROTH), ("write", stat.S_IWOTH), ("execute", stat.S_IXOTH)))
+)
+
 @app.list_resources()
 async def list_resources() -> List[Resource]:
     """列出可用的檔案系統監控資源"""
@@ -67,17 +75,16 @@ async def read_resource(uri: str) -> str:
         # 如果是目錄，獲取子項目數量和總大小
         if os.path.isdir(path):
             try:
-                items = list(os.listdir(path))
+                items = os.listdir(path)
                 info["item_count"] = len(items)
                 
                 total_size = 0
-                for item in items[:100]:  # 限制前100個項目避免太慢
-                    item_path = os.path.join(path, item)
-                    if os.path.exists(item_path):
-                        try:
-                            total_size += os.path.getsize(item_path)
-                        except (OSError, PermissionError):
-                            continue
+                for item in islice(items, 100):  # 限制前100個項目避免太慢
+                    # getsize 對不存在的項目會拋出 OSError，不需先呼叫 exists 多做一次 stat
+                    try:
+                        total_size += os.path.getsize(os.path.join(path, item))
+                    except (OSError, PermissionError):
+                        continue
                 info["total_size_sample"] = total_size
             except PermissionError:
                 info["permission_error"] = True
@@ -169,19 +176,25 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
                 items = []
                 total_size = 0
                 
-                for item in os.listdir(dir_path):
-                    item_path = os.path.join(dir_path, item)
+                # scandir 一次取得名稱與路徑，先讀完再關閉，避免遞迴時累積開啟的目錄
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+                
+                for entry in entries:
+                    item_path = entry.path
                     try:
-                        stat_info = os.stat(item_path)
+                        # 每個項目只 stat 一次，目錄判斷直接使用 st_mode (與 os.path.isdir 相同會追蹤符號連結)
+                        stat_info = entry.stat()
+                        is_dir = stat.S_ISDIR(stat_info.st_mode)
                         item_info = {
-                            "name": item,
+                            "name": entry.name,
                             "path": item_path,
-                            "is_dir": os.path.isdir(item_path),
+                            "is_dir": is_dir,
                             "size": stat_info.st_size,
                             "mtime": datetime.fromtimestamp(stat_info.st_mtime).isoformat()
                         }
                         
-                        if os.path.isdir(item_path) and current_depth < max_depth:
+                        if is_dir and current_depth < max_depth:
                             subdir_info = scan_dir(item_path, current_depth + 1)
                             item_info["subdirectory"] = subdir_info
                         
@@ -213,25 +226,12 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
             
             permissions = {
                 "path": path,
-                "mode": oct(mode),
-                "owner": {
-                    "read": bool(mode & stat.S_IRUSR),
-                    "write": bool(mode & stat.S_IWUSR),
-                    "execute": bool(mode & stat.S_IXUSR)
-                },
-                "group": {
-                    "read": bool(mode & stat.S_IRGRP),
-                    "write": bool(mode & stat.S_IWGRP),
-                    "execute": bool(mode & stat.S_IXGRP)
-                },
-                "others": {
-                    "read": bool(mode & stat.S_IROTH),
-                    "write": bool(mode & stat.S_IWOTH),
-                    "execute": bool(mode & stat.S_IXOTH)
-                },
-                "uid": stat_info.st_uid,
-                "gid": stat_info.st_gid
+                "mode": oct(mode)
             }
+            for role, bits in PERMISSION_BITS:
+                permissions[role] = {action: bool(mode & bit) for action, bit in bits}
+            permissions["uid"] = stat_info.st_uid
+            permissions["gid"] = stat_info.st_gid
             
             return [json.dumps(permissions, indent=2, ensure_ascii=False)]
         except (OSError, PermissionError) as e:
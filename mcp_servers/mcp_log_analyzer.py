@@ -5,10 +5,13 @@
 """
 
 import asyncio
+import heapq
 import json
 import os
 import re
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
 from mcp.server import Server
 from mcp.types import Resource, Tool
@@ -19,6 +22,48 @@ app = Server("log-analyzer")
 # 從環境變數取得日誌路徑
 LOG_PATHS = os.environ.get("LOG_PATHS", "/var/log/syslog,/var/log/auth.log").split(",")
 
+# 預先編譯的錯誤/警告關鍵字比對 (不分大小寫，單一正規表達式涵蓋所有關鍵字)
+ERROR_TREND_RE = re.compile(r'\b(?:error|fail|exception|crash|timeout|denied)\b', re.IGNORECASE)
+ERROR_LINE_RE = re.compile(r'\b(?:error|fail|exception|critical|fatal)\b', re.IGNORECASE)
+WARNING_LINE_RE = re.compile(r'\b(?:warn|warning)\b', re.IGNORECASE)
+
+# 日誌等級與來源的比對模式 (依序嘗試)
+LOG_LEVEL_PATTERNS = (
+    re.compile(r'\b(DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\b', re.IGNORECASE),
+    re.compile(r'\[(DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\]', re.IGNORECASE)
+)
+SOURCE_PATTERNS = (
+    re.compile(r'\b(\w+)\[\d+\]:'),  # service[pid]:
+    re.compile(r'\b(\w+):'),         # service:
+    re.compile(r'\[(\w+)\]')         # [service]
+)
+
+# 時間戳記格式 (依序嘗試): ISO、標準格式、Syslog
+TIMESTAMP_PATTERNS = (
+    re.compile(r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})'),
+    re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'),
+    re.compile(r'(\w{3}) (\d{1,2}) (\d{2}):(\d{2}):(\d{2})')
+)
+SYSLOG_MONTHS = {
+    name: index for index, name in enumerate(
+        ('jan', 'feb', 'mar', 'apr', 'may', 'jun',
+         'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)
+}
+
+# 錯誤類型對照表 (依序比對，第一個符合者即為錯誤類型)
+ERROR_TYPE_PATTERNS = (
+    (re.compile(r'\btimeout\b', re.IGNORECASE), "timeout"),
+    (re.compile(r'\bconnection\b', re.IGNORECASE), "connection"),
+    (re.compile(r'\bpermission\b', re.IGNORECASE), "permission"),
+    (re.compile(r'\bauthentication\b', re.IGNORECASE), "authentication"),
+    (re.compile(r'\bfile|directory\b', re.IGNORECASE), "filesystem")
+)
+
+# 日誌尾端分析快取: 路徑 -> ((mtime, size), 分析結果)
+# 資源 URI 可指向任意路徑，限制筆數並淘汰最久未使用者
+TAIL_CACHE_MAX_ENTRIES = 32
+_tail_analysis_cache = OrderedDict()
+
 @app.list_resources()
 async def list_resources() -> List[Resource]:
     """列出可用的日誌分析資源"""
@@ -48,24 +93,37 @@ async def read_resource(uri: str) -> str:
         # 獲取檔案基本資訊
         stat_info = os.stat(log_path)
         
-        # 讀取最後幾行進行分析
-        tail_lines = read_tail_lines(log_path, 100)
-        
-        # 分析日誌等級
-        log_levels = analyze_log_levels(tail_lines)
+        # 檔案未變更 (mtime 與大小相同) 時直接沿用上次的分析結果
+        file_version = (stat_info.st_mtime, stat_info.st_size)
+        cached = _tail_analysis_cache.get(log_path)
         
-        # 檢測錯誤和警告
-        errors_warnings = detect_errors_warnings(tail_lines)
+        if cached and cached[0] == file_version:
+            analysis = cached[1]
+            _tail_analysis_cache.move_to_end(log_path)
+        else:
+            # 讀取最後幾行進行分析 (於執行緒池中進行檔案 I/O)
+            loop = asyncio.get_running_loop()
+            tail_lines = await loop.run_in_executor(None, read_tail_lines, log_path, 100)
+            
+            analysis = {
+                "recent_lines_analyzed": len(tail_lines),
+                # 分析日誌等級
+                "log_levels": analyze_log_levels(tail_lines),
+                # 檢測錯誤和警告
+                "recent_errors_warnings": detect_errors_warnings(tail_lines),
+                "sample_lines": tail_lines[-10:] if tail_lines else []
+            }
+            _tail_analysis_cache[log_path] = (file_version, analysis)
+            _tail_analysis_cache.move_to_end(log_path)
+            while len(_tail_analysis_cache) > TAIL_CACHE_MAX_ENTRIES:
+                _tail_analysis_cache.popitem(last=False)
         
         result = {
             "timestamp": datetime.now().isoformat(),
             "log_file": log_path,
             "file_size": stat_info.st_size,
             "last_modified": datetime.fromtimestamp(stat_info.st_mtime).isoformat(),
-            "recent_lines_analyzed": len(tail_lines),
-            "log_levels": log_levels,
-            "recent_errors_warnings": errors_warnings,
-            "sample_lines": tail_lines[-10:] if tail_lines else []
+            **analysis
         }
         
         return json.dumps(result, indent=2, ensure_ascii=False)
@@ -166,25 +224,13 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
             # 計算時間範圍
             cutoff_time = datetime.now() - timedelta(hours=time_range_hours)
             
-            matches = []
             regex = re.compile(pattern, re.IGNORECASE)
             
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line_num, line in enumerate(f, 1):
-                    if len(matches) >= max_results:
-                        break
-                    
-                    line = line.strip()
-                    if regex.search(line):
-                        # 嘗試解析時間戳記
-                        log_time = parse_log_timestamp(line)
-                        
-                        if log_time is None or log_time >= cutoff_time:
-                            matches.append({
-                                "line_number": line_num,
-                                "content": line,
-                                "timestamp": log_time.isoformat() if log_time else None
-                            })
+            # 在執行緒池中讀取檔案，避免阻塞事件迴圈
+            loop = asyncio.get_running_loop()
+            matches = await loop.run_in_executor(
+                None, search_log_file, log_file, regex, cutoff_time, max_results
+            )
             
             result = {
                 "log_file": log_file,
@@ -209,32 +255,11 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
         try:
             cutoff_time = datetime.now() - timedelta(hours=time_window_hours)
             
-            # 錯誤關鍵字
-            error_patterns = [
-                r'\berror\b', r'\bfail\b', r'\bexception\b',
-                r'\bcrash\b', r'\btimeout\b', r'\bdenied\b'
-            ]
-            
-            hourly_counts = {}
-            error_types = {}
-            
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    log_time = parse_log_timestamp(line)
-                    
-                    if log_time and log_time >= cutoff_time:
-                        hour_key = log_time.strftime("%Y-%m-%d %H:00")
-                        
-                        # 檢查是否包含錯誤
-                        for pattern in error_patterns:
-                            if re.search(pattern, line, re.IGNORECASE):
-                                hourly_counts[hour_key] = hourly_counts.get(hour_key, 0) + 1
-                                
-                                # 統計錯誤類型
-                                error_type = extract_error_type(line)
-                                error_types[error_type] = error_types.get(error_type, 0) + 1
-                                break
+            # 在執行緒池中讀取檔案，避免阻塞事件迴圈
+            loop = asyncio.get_running_loop()
+            hourly_counts, error_types = await loop.run_in_executor(
+                None, collect_error_trends, log_file, cutoff_time
+            )
             
             result = {
                 "log_file": log_file,
@@ -258,25 +283,11 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
             return [f"日誌檔案不存在: {log_file}"]
         
         try:
-            lines = read_tail_lines(log_file, lines_to_analyze)
-            
-            # 統計各種資訊
-            log_levels = analyze_log_levels(lines)
+            loop = asyncio.get_running_loop()
+            lines = await loop.run_in_executor(None, read_tail_lines, log_file, lines_to_analyze)
             
-            # 統計來源/服務
-            sources = {}
-            for line in lines:
-                source = extract_source(line)
-                if source:
-                    sources[source] = sources.get(source, 0) + 1
-            
-            # 統計時間分佈
-            hourly_distribution = {}
-            for line in lines:
-                log_time = parse_log_timestamp(line)
-                if log_time:
-                    hour = log_time.hour
-                    hourly_distribution[hour] = hourly_distribution.get(hour, 0) + 1
+            # 單次遍歷同時統計日誌等級、來源/服務與時間分佈
+            log_levels, sources, hourly_distribution = collect_log_stats(lines)
             
             file_stat = os.stat(log_file)
             
@@ -286,7 +297,7 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
                 "file_size_mb": round(file_stat.st_size / (1024 * 1024), 2),
                 "lines_analyzed": len(lines),
                 "log_levels": log_levels,
-                "top_sources": dict(sorted(sources.items(), key=lambda x: x[1], reverse=True)[:10]),
+                "top_sources": dict(heapq.nlargest(10, sources.items(), key=itemgetter(1))),
                 "hourly_distribution": hourly_distribution,
                 "last_modified": datetime.fromtimestamp(file_stat.st_mtime).isoformat()
             }
@@ -299,43 +310,114 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
     else:
         raise ValueError(f"未知的工具: {name}")
 
+def search_log_file(log_file, regex, cutoff_time, max_results):
+    """逐行搜尋日誌檔案中符合模式且在時間範圍內的行"""
+    matches = []
+    current_year = datetime.now().year
+    
+    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line_num, line in enumerate(f, 1):
+            if len(matches) >= max_results:
+                break
+            
+            line = line.strip()
+            if regex.search(line):
+                # 嘗試解析時間戳記
+                log_time = parse_log_timestamp(line, current_year)
+                
+                if log_time is None or log_time >= cutoff_time:
+                    matches.append({
+                        "line_number": line_num,
+                        "content": line,
+                        "timestamp": log_time.isoformat() if log_time else None
+                    })
+    
+    return matches
+
+def collect_error_trends(log_file, cutoff_time):
+    """統計時間範圍內每小時的錯誤數量與錯誤類型"""
+    hourly_counts = {}
+    error_types = {}
+    current_year = datetime.now().year
+    
+    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            # 先做便宜的錯誤關鍵字比對，多數非錯誤行不必解析時間戳記
+            if not ERROR_TREND_RE.search(line):
+                continue
+            
+            line = line.strip()
+            log_time = parse_log_timestamp(line, current_year)
+            
+            if log_time and log_time >= cutoff_time:
+                hour_key = log_time.strftime("%Y-%m-%d %H:00")
+                hourly_counts[hour_key] = hourly_counts.get(hour_key, 0) + 1
+                
+                # 統計錯誤類型
+                error_type = extract_error_type(line)
+                error_types[error_type] = error_types.get(error_type, 0) + 1
+    
+    return hourly_counts, error_types
+
 def read_tail_lines(file_path, num_lines):
     """讀取檔案最後幾行"""
+    # 不需任何行時直接返回 (lines[-0:] 會取得全部內容)
+    if num_lines <= 0:
+        return []
+    
     try:
         with open(file_path, 'rb') as f:
             # 移到檔案末尾
             f.seek(0, 2)
-            file_size = f.tell()
+            position = f.tell()
             
-            lines = []
+            chunks = []
+            newline_count = 0
             buffer_size = 8192
-            position = file_size
             
-            while len(lines) < num_lines and position > 0:
-                # 計算讀取位置
+            # 從末尾往前讀取區塊，直到累積足夠的換行數
+            while newline_count <= num_lines and position > 0:
                 read_size = min(buffer_size, position)
                 position -= read_size
                 f.seek(position)
                 
-                # 讀取並分割行
-                chunk = f.read(read_size).decode('utf-8', errors='ignore')
-                chunk_lines = chunk.split('\n')
-                
-                # 合併第一行到之前的行
-                if lines and chunk_lines:
-                    lines[0] = chunk_lines[-1] + lines[0]
-                    chunk_lines = chunk_lines[:-1]
-                
-                # 添加新行到開頭
-                lines = chunk_lines + lines
+                chunk = f.read(read_size)
+                chunks.append(chunk)
+                newline_count += chunk.count(b'\n')
+            
+            # 反轉後一次合併並解碼，避免每個區塊都重新複製整個行列表
+            content = b''.join(reversed(chunks)).decode('utf-8', errors='ignore')
             
             # 移除空行並返回指定數量
-            lines = [line for line in lines if line.strip()]
+            lines = [line for line in content.split('\n') if line.strip()]
             return lines[-num_lines:] if len(lines) > num_lines else lines
             
     except Exception:
         return []
 
+def collect_log_stats(lines):
+    """單次遍歷日誌行，統計日誌等級、來源/服務與每小時分佈"""
+    log_levels = {}
+    sources = {}
+    hourly_distribution = {}
+    current_year = datetime.now().year
+    
+    for line in lines:
+        level = extract_log_level(line)
+        if level:
+            log_levels[level] = log_levels.get(level, 0) + 1
+        
+        source = extract_source(line)
+        if source:
+            sources[source] = sources.get(source, 0) + 1
+        
+        log_time = parse_log_timestamp(line, current_year)
+        if log_time:
+            hour = log_time.hour
+            hourly_distribution[hour] = hourly_distribution.get(hour, 0) + 1
+    
+    return log_levels, sources, hourly_distribution
+
 def analyze_log_levels(lines):
     """分析日誌等級"""
     levels = {}
@@ -347,87 +429,65 @@ def analyze_log_levels(lines):
 
 def extract_log_level(line):
     """從日誌行中提取日誌等級"""
-    patterns = [
-        r'\b(DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\b',
-        r'\[(DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\]'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, line, re.IGNORECASE)
+    for pattern in LOG_LEVEL_PATTERNS:
+        match = pattern.search(line)
         if match:
             return match.group(1).upper()
     return None
 
 def detect_errors_warnings(lines):
     """檢測錯誤和警告"""
-    issues = []
+    # 只保留最近 20 個問題，較舊的項目自動淘汰
+    issues = deque(maxlen=20)
     for line in lines:
-        if re.search(r'\b(error|fail|exception|critical|fatal)\b', line, re.IGNORECASE):
+        if ERROR_LINE_RE.search(line):
             issues.append({
                 "type": "error",
                 "content": line
             })
-        elif re.search(r'\b(warn|warning)\b', line, re.IGNORECASE):
+        elif WARNING_LINE_RE.search(line):
             issues.append({
                 "type": "warning", 
                 "content": line
             })
-    return issues[-20:]  # 返回最近20個問題
+    return list(issues)
 
-def parse_log_timestamp(line):
-    """解析日誌時間戳記"""
-    # 常見的時間戳記格式
-    patterns = [
-        r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})',  # ISO format
-        r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})',  # Standard format
-        r'(\w{3} \d{1,2} \d{2}:\d{2}:\d{2})',      # Syslog format
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, line)
+def parse_log_timestamp(line, year=None):
+    """解析日誌時間戳記 (Syslog 格式不含年份，預設使用今年；大量解析時可由呼叫端傳入 year)"""
+    for pattern in TIMESTAMP_PATTERNS:
+        match = pattern.search(line)
         if match:
-            timestamp_str = match.group(1)
             try:
-                if 'T' in timestamp_str:
-                    return datetime.fromisoformat(timestamp_str.replace('T', ' '))
-                elif len(timestamp_str) == 19:  # YYYY-MM-DD HH:MM:SS
-                    return datetime.strptime(timestamp_str, "%Y-%m-%d %H:%M:%S")
-                else:  # Syslog format
-                    current_year = datetime.now().year
-                    return datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
-            except:
+                if match.lastindex == 1:  # ISO / YYYY-MM-DD HH:MM:SS
+                    # fromisoformat 同時接受 'T' 與空白分隔，且遠快於 strptime
+                    return datetime.fromisoformat(match.group(1))
+                else:  # Syslog format: 直接以擷取欄位建立 datetime，避開 strptime
+                    month = SYSLOG_MONTHS.get(match.group(1).lower())
+                    if month is None:
+                        continue
+                    if year is None:
+                        year = datetime.now().year
+                    return datetime(year, month, int(match.group(2)),
+                                    int(match.group(3)), int(match.group(4)), int(match.group(5)))
+            except ValueError:
                 continue
     return None
 
 def extract_source(line):
     """從日誌行中提取來源/服務名稱"""
     # 嘗試提取常見的服務名稱模式
-    patterns = [
-        r'\b(\w+)\[\d+\]:',  # service[pid]:
-        r'\b(\w+):',         # service:
-        r'\[(\w+)\]'         # [service]
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, line)
+    for pattern in SOURCE_PATTERNS:
+        match = pattern.search(line)
         if match:
             return match.group(1)
     return "unknown"
 
 def extract_error_type(line):
     """從錯誤行中提取錯誤類型"""
-    if re.search(r'\btimeout\b', line, re.IGNORECASE):
-        return "timeout"
-    elif re.search(r'\bconnection\b', line, re.IGNORECASE):
-        return "connection"
-    elif re.search(r'\bpermission\b', line, re.IGNORECASE):
-        return "permission"
-    elif re.search(r'\bauthentication\b', line, re.IGNORECASE):
-        return "authentication"
-    elif re.search(r'\bfile|directory\b', line, re.IGNORECASE):
-        return "filesystem"
-    else:
-        return "general"
+    for pattern, error_type in ERROR_TYPE_PATTERNS:
+        if pattern.search(line):
+            return error_type
+    return "general"
 
 if __name__ == "__main__":
     import mcp.server.stdio
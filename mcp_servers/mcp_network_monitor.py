@@ -20,6 +20,28 @@ app = Server("network-monitor")
 # 從環境變數取得監控介面
 MONITOR_INTERFACES = os.environ.get("MONITOR_INTERFACES", "eth0,wlan0").split(",")
 
+# 常見埠號與服務名稱對照表
+SERVICE_PORTS = {
+    22: "SSH",
+    23: "Telnet",
+    25: "SMTP",
+    53: "DNS",
+    80: "HTTP",
+    110: "POP3",
+    143: "IMAP",
+    443: "HTTPS",
+    993: "IMAPS",
+    995: "POP3S",
+    3306: "MySQL",
+    5432: "PostgreSQL",
+    6379: "Redis",
+    27017: "MongoDB"
+}
+
+# 埠掃描的連線逾時秒數與同時連線上限
+PORT_SCAN_TIMEOUT = 3
+PORT_SCAN_CONCURRENCY = 64
+
 @app.list_resources()
 async def list_resources() -> List[Resource]:
     """列出可用的網路監控資源"""
@@ -50,9 +72,13 @@ async def read_resource(uri: str) -> str:
     if uri == "network://interfaces":
         interfaces = {}
         
-        # 獲取所有網路介面
+        # 獲取介面統計與 I/O 統計
+        stats = psutil.net_if_stats()
+        io_counters = psutil.net_io_counters(pernic=True)
+        
+        # 單次遍歷所有網路介面，同時整理位址、狀態與 I/O 資訊
         for interface, addrs in psutil.net_if_addrs().items():
-            interfaces[interface] = {
+            interface_info = {
                 "addresses": []
             }
             
@@ -63,26 +89,20 @@ async def read_resource(uri: str) -> str:
                     "netmask": addr.netmask,
                     "broadcast": addr.broadcast
                 }
-                interfaces[interface]["addresses"].append(addr_info)
-        
-        # 獲取介面統計
-        stats = psutil.net_if_stats()
-        for interface in interfaces:
-            if interface in stats:
-                stat = stats[interface]
-                interfaces[interface]["stats"] = {
+                interface_info["addresses"].append(addr_info)
+            
+            stat = stats.get(interface)
+            if stat:
+                interface_info["stats"] = {
                     "isup": stat.isup,
                     "duplex": str(stat.duplex),
                     "speed": stat.speed,
                     "mtu": stat.mtu
                 }
-        
-        # 獲取 I/O 統計
-        io_counters = psutil.net_io_counters(pernic=True)
-        for interface in interfaces:
-            if interface in io_counters:
-                counter = io_counters[interface]
-                interfaces[interface]["io"] = {
+            
+            counter = io_counters.get(interface)
+            if counter:
+                interface_info["io"] = {
                     "bytes_sent": counter.bytes_sent,
                     "bytes_recv": counter.bytes_recv,
                     "packets_sent": counter.packets_sent,
@@ -92,6 +112,8 @@ async def read_resource(uri: str) -> str:
                     "dropin": counter.dropin,
                     "dropout": counter.dropout
                 }
+            
+            interfaces[interface] = interface_info
         
         result = {
             "timestamp": datetime.now().isoformat(),
@@ -237,25 +259,30 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
         count = arguments.get("count", 4)
         
         try:
-            # 使用 ping 命令
-            result = subprocess.run(
-                ["ping", "-c", str(count), host],
-                capture_output=True,
-                text=True,
-                timeout=30
+            # 使用 ping 命令（非同步執行，避免等待期間阻塞事件迴圈）
+            proc = await asyncio.create_subprocess_exec(
+                "ping", "-c", str(count), host,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=30)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise
             
             ping_result = {
                 "host": host,
                 "count": count,
-                "success": result.returncode == 0,
-                "output": result.stdout,
-                "error": result.stderr if result.returncode != 0 else None
+                "success": proc.returncode == 0,
+                "output": stdout.decode(errors="replace"),
+                "error": stderr.decode(errors="replace") if proc.returncode != 0 else None
             }
             
             return [json.dumps(ping_result, indent=2, ensure_ascii=False)]
             
-        except subprocess.TimeoutExpired:
+        except asyncio.TimeoutError:
             return [json.dumps({"error": f"Ping {host} 超時"}, ensure_ascii=False)]
         except Exception as e:
             return [json.dumps({"error": f"Ping 失敗: {e}"}, ensure_ascii=False)]
@@ -264,26 +291,9 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
         host = arguments["host"]
         ports = arguments.get("ports", [22, 80, 443, 3306, 5432, 6379])
         
-        scan_results = []
-        
-        for port in ports:
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(3)
-                result = sock.connect_ex((host, port))
-                sock.close()
-                
-                scan_results.append({
-                    "port": port,
-                    "open": result == 0,
-                    "service": get_service_name(port)
-                })
-            except Exception as e:
-                scan_results.append({
-                    "port": port,
-                    "open": False,
-                    "error": str(e)
-                })
+        # 同時探測所有埠，總耗時約為最慢的單一埠而非逐埠累加
+        semaphore = asyncio.Semaphore(PORT_SCAN_CONCURRENCY)
+        scan_results = list(await asyncio.gather(*(check_port(host, port, semaphore) for port in ports)))
         
         result = {
             "host": host,
@@ -305,9 +315,10 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
             
             if result.returncode == 0:
                 routes = []
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        routes.append(line.strip())
+                for line in result.stdout.splitlines():
+                    line = line.strip()
+                    if line:
+                        routes.append(line)
                 
                 routing_info = {
                     "timestamp": datetime.now().isoformat(),
@@ -327,25 +338,37 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
     else:
         raise ValueError(f"未知的工具: {name}")
 
+async def check_port(host, port, semaphore):
+    """以非阻塞連線檢查單一埠是否開啟"""
+    try:
+        async with semaphore:
+            connect = asyncio.open_connection(host, port, family=socket.AF_INET)
+            try:
+                writer = (await asyncio.wait_for(connect, timeout=PORT_SCAN_TIMEOUT))[1]
+            except socket.gaierror:
+                raise
+            except (OSError, asyncio.TimeoutError):
+                # 連線被拒或逾時視為關閉 (與 connect_ex 回傳非 0 相同)
+                is_open = False
+            else:
+                is_open = True
+                writer.close()
+        
+        return {
+            "port": port,
+            "open": is_open,
+            "service": get_service_name(port)
+        }
+    except Exception as e:
+        return {
+            "port": port,
+            "open": False,
+            "error": str(e)
+        }
+
 def get_service_name(port):
     """根據埠號獲取常見服務名稱"""
-    services = {
-        22: "SSH",
-        23: "Telnet", 
-        25: "SMTP",
-        53: "DNS",
-        80: "HTTP",
-        110: "POP3",
-        143: "IMAP",
-        443: "HTTPS",
-        993: "IMAPS",
-        995: "POP3S",
-        3306: "MySQL",
-        5432: "PostgreSQL",
-        6379: "Redis",
-        27017: "MongoDB"
-    }
-    return services.get(port, "Unknown")
+    return SERVICE_PORTS.get(port, "Unknown")
 
 if __name__ == "__main__":
     import mcp.server.stdio
@@ -5,10 +5,12 @@
 """
 
 import asyncio
+import heapq
 import json
 import os
 import signal
 from datetime import datetime
+from operator import itemgetter
 from mcp.server import Server
 from mcp.types import Resource, Tool
 from typing import Any, Dict, List
@@ -19,6 +21,15 @@ app = Server("process-monitor")
 # 從環境變數取得要監控的進程
 MONITOR_PROCESSES = os.environ.get("MONITOR_PROCESSES", "apache2,nginx,mysql").split(",")
 
+# 信號名稱對照表
+SIGNAL_MAP = {
+    "TERM": signal.SIGTERM,
+    "KILL": signal.SIGKILL,
+    "HUP": signal.SIGHUP,
+    "USR1": signal.SIGUSR1,
+    "USR2": signal.SIGUSR2
+}
+
 @app.list_resources()
 async def list_resources() -> List[Resource]:
     """列出可用的進程監控資源"""
@@ -70,17 +81,17 @@ async def read_resource(uri: str) -> str:
     elif uri == "process://monitored":
         monitored_status = []
         
+        # 單次遍歷進程列表，同時比對所有監控名稱
+        matched = find_processes_by_keywords(
+            MONITOR_PROCESSES, ['pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'create_time'])
+        
         for process_name in MONITOR_PROCESSES:
             found_processes = []
             
-            for proc in psutil.process_iter(['pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'create_time']):
-                try:
-                    if process_name.lower() in proc.info['name'].lower():
-                        info = proc.info.copy()
-                        info['create_time'] = datetime.fromtimestamp(info['create_time']).isoformat()
-                        found_processes.append(info)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            for proc_info in matched[process_name]:
+                info = proc_info.copy()
+                info['create_time'] = datetime.fromtimestamp(info['create_time']).isoformat()
+                found_processes.append(info)
             
             monitored_status.append({
                 "process_name": process_name,
@@ -110,11 +121,12 @@ async def read_resource(uri: str) -> str:
         except Exception as e:
             return json.dumps({"error": f"無法獲取進程資訊: {e}"}, ensure_ascii=False)
         
-        # 依照 CPU 使用率排序
-        top_cpu = sorted(processes, key=lambda x: x.get('cpu_percent', 0), reverse=True)[:10]
+        # 只需前 10 名，以 heapq 挑選而不必排序整份進程列表
+        # 依照 CPU 使用率
+        top_cpu = heapq.nlargest(10, processes, key=itemgetter('cpu_percent'))
         
-        # 依照記憶體使用率排序
-        top_memory = sorted(processes, key=lambda x: x.get('memory_percent', 0), reverse=True)[:10]
+        # 依照記憶體使用率
+        top_memory = heapq.nlargest(10, processes, key=itemgetter('memory_percent'))
         
         result = {
             "timestamp": datetime.now().isoformat(),
@@ -279,20 +291,11 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
             proc = psutil.Process(pid)
             process_name = proc.name()
             
-            # 轉換信號名稱
-            signal_map = {
-                "TERM": signal.SIGTERM,
-                "KILL": signal.SIGKILL,
-                "HUP": signal.SIGHUP,
-                "USR1": signal.SIGUSR1,
-                "USR2": signal.SIGUSR2
-            }
-            
-            if signal_name not in signal_map:
+            if signal_name not in SIGNAL_MAP:
                 return [f"不支援的信號: {signal_name}"]
             
             # 發送信號
-            proc.send_signal(signal_map[signal_name])
+            proc.send_signal(SIGNAL_MAP[signal_name])
             
             result = {
                 "pid": pid,
@@ -353,6 +356,11 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
         
         health_status = []
         
+        # 單次遍歷進程列表，一次找出所有服務的相關進程
+        matched = find_processes_by_keywords(
+            services, ['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'memory_info']
+        )
+        
         for service in services:
             status = {
                 "service": service,
@@ -362,23 +370,18 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
                 "total_cpu_percent": 0
             }
             
-            # 尋找相關進程
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status', 'memory_info']):
-                try:
-                    if service.lower() in proc.info['name'].lower():
-                        status["running"] = True
-                        status["processes"].append({
-                            "pid": proc.info['pid'],
-                            "name": proc.info['name'],
-                            "status": proc.info['status'],
-                            "cpu_percent": proc.info['cpu_percent'],
-                            "memory_percent": proc.info['memory_percent']
-                        })
-                        status["total_cpu_percent"] += proc.info['cpu_percent'] or 0
-                        if proc.info['memory_info']:
-                            status["total_memory_mb"] += proc.info['memory_info'].rss / (1024 * 1024)
-                except (psutil.NoSuchProcess, psutil.AccessDenied):
-                    continue
+            for info in matched[service]:
+                status["running"] = True
+                status["processes"].append({
+                    "pid": info['pid'],
+                    "name": info['name'],
+                    "status": info['status'],
+                    "cpu_percent": info['cpu_percent'],
+                    "memory_percent": info['memory_percent']
+                })
+                status["total_cpu_percent"] += info['cpu_percent'] or 0
+                if info['memory_info']:
+                    status["total_memory_mb"] += info['memory_info'].rss / (1024 * 1024)
             
             status["process_count"] = len(status["processes"])
             status["total_memory_mb"] = round(status["total_memory_mb"], 2)
@@ -398,6 +401,23 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
     else:
         raise ValueError(f"未知的工具: {name}")
 
+def find_processes_by_keywords(keywords, attrs):
+    """單次遍歷進程列表，依名稱關鍵字 (不分大小寫) 分組進程資訊"""
+    matched = {keyword: [] for keyword in keywords}
+    lowered = [(keyword, keyword.lower()) for keyword in matched]
+    
+    for proc in psutil.process_iter(attrs):
+        try:
+            name = (proc.info['name'] or '').lower()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        
+        for keyword, keyword_lower in lowered:
+            if keyword_lower in name:
+                matched[keyword].append(proc.info)
+    
+    return matched
+
 if __name__ == "__main__":
     import mcp.server.stdio
     mcp.server.stdio.run_server(app)
@@ -15,6 +15,13 @@ from typing import Any, Dict, List
 
 app = Server("system-monitor")
 
+# 先取一次 CPU 基準樣本，之後以 interval=None 讀取與上次呼叫之間的使用率，不必阻塞等待取樣
+psutil.cpu_percent(interval=None)
+psutil.cpu_percent(interval=None, percpu=True)
+
+# CPU 核心數在執行期間不會改變，啟動時讀取一次
+CPU_COUNT = psutil.cpu_count()
+
 @app.list_resources()
 async def list_resources() -> List[Resource]:
     """列出可用的系統監控資源"""
@@ -49,11 +56,11 @@ async def list_resources() -> List[Resource]:
 async def read_resource(uri: str) -> str:
     """讀取系統監控資源"""
     if uri == "system://cpu":
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
+        cpu_percent = psutil.cpu_percent(interval=None, percpu=True)
         cpu_info = {
             "timestamp": datetime.now().isoformat(),
-            "cpu_count": psutil.cpu_count(),
-            "cpu_percent_total": psutil.cpu_percent(interval=1),
+            "cpu_count": CPU_COUNT,
+            "cpu_percent_total": psutil.cpu_percent(interval=None),
             "cpu_percent_per_core": cpu_percent,
             "load_average": psutil.getloadavg() if hasattr(psutil, 'getloadavg') else None
         }
@@ -157,7 +164,7 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
     """執行系統監控工具"""
     if name == "get_system_summary":
         # 獲取系統整體摘要
-        cpu_percent = psutil.cpu_percent(interval=1)
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
         disk_usage = psutil.disk_usage('/')
         
@@ -173,7 +180,7 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[Any]:
             },
             "cpu": {
                 "percent": cpu_percent,
-                "count": psutil.cpu_count()
+                "count": CPU_COUNT
             },
             "memory": {
                 "total_gb": round(memory.total / (1024**3), 2),
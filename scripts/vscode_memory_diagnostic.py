@@ -9,9 +9,16 @@ import time
 import json
 import subprocess
 import os
+import platform
 from datetime import datetime, timedelta
 import sys
 
+# VS Code 相關進程的名稱/命令列關鍵字
+VSCODE_KEYWORDS = ('code', 'node', 'copilot', 'typescript', 'eslint', 'electron')
+
+# 各項進程分析需要的欄位聯集
+PROCESS_SNAPSHOT_ATTRS = ['pid', 'name', 'cmdline', 'memory_info', 'memory_percent', 'create_time']
+
 class VSCodeMemoryDiagnostic:
     def __init__(self):
         self.report = {
@@ -22,12 +29,18 @@ class VSCodeMemoryDiagnostic:
             'ssh_connections': [],
             'recommendations': []
         }
+        # 進程資訊快照，於第一次需要時掃描一次，供各項分析共用
+        self.process_snapshot = None
+    
+    def get_process_snapshot(self):
+        """取得所有進程資訊 (單次掃描後重複使用)"""
+        if self.process_snapshot is None:
+            self.process_snapshot = [proc.info for proc in psutil.process_iter(PROCESS_SNAPSHOT_ATTRS)]
+        return self.process_snapshot
     
     def collect_system_info(self):
         """收集系統基本資訊"""
         try:
-            import platform
-            
             # 系統資訊
             uname = platform.uname()
             self.report['system_info'] = {
@@ -68,9 +81,8 @@ class VSCodeMemoryDiagnostic:
         try:
             # 獲取所有進程的記憶體使用
             processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'memory_percent', 'cmdline']):
+            for pinfo in self.get_process_snapshot():
                 try:
-                    pinfo = proc.info
                     memory_mb = pinfo['memory_info'].rss / (1024 * 1024)
                     if memory_mb > 10:  # 只記錄使用超過10MB的進程
                         processes.append({
@@ -98,17 +110,17 @@ class VSCodeMemoryDiagnostic:
     def analyze_vscode_processes(self):
         """分析VS Code相關進程"""
         try:
-            vscode_keywords = ['code', 'node', 'copilot', 'typescript', 'eslint', 'electron']
             vscode_processes = []
             
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'memory_info', 'memory_percent', 'create_time']):
+            for pinfo in self.get_process_snapshot():
                 try:
-                    pinfo = proc.info
                     cmdline = ' '.join(pinfo['cmdline']) if pinfo['cmdline'] else ''
                     
-                    # 檢查是否為VS Code相關進程
-                    is_vscode = any(keyword in cmdline.lower() or keyword in pinfo['name'].lower() 
-                                  for keyword in vscode_keywords)
+                    # 檢查是否為VS Code相關進程（小寫轉換只做一次，不在每個關鍵字重複）
+                    cmdline_lower = cmdline.lower()
+                    name_lower = pinfo['name'].lower()
+                    is_vscode = any(keyword in cmdline_lower or keyword in name_lower
+                                  for keyword in VSCODE_KEYWORDS)
                     
                     if is_vscode:
                         memory_mb = pinfo['memory_info'].rss / (1024 * 1024)
@@ -163,15 +175,15 @@ class VSCodeMemoryDiagnostic:
             
             # 檢查SSH進程
             ssh_processes = []
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'memory_info']):
+            for pinfo in self.get_process_snapshot():
                 try:
-                    if 'sshd' in proc.info['name'] or 'ssh' in proc.info['name']:
-                        memory_mb = proc.info['memory_info'].rss / (1024 * 1024)
+                    if 'sshd' in pinfo['name'] or 'ssh' in pinfo['name']:
+                        memory_mb = pinfo['memory_info'].rss / (1024 * 1024)
                         ssh_processes.append({
-                            'pid': proc.info['pid'],
-                            'name': proc.info['name'],
+                            'pid': pinfo['pid'],
+                            'name': pinfo['name'],
                             'memory_mb': round(memory_mb, 1),
-                            'cmdline': ' '.join(proc.info['cmdline']) if proc.info['cmdline'] else ''
+                            'cmdline': ' '.join(pinfo['cmdline']) if pinfo['cmdline'] else ''
                         })
                 except:
                     continue
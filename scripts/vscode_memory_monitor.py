@@ -23,6 +23,9 @@ logging.basicConfig(
     ]
 )
 
+# VS Code 相關進程的名稱/命令列關鍵字
+VSCODE_KEYWORDS = ('code-server', 'node', 'copilot', 'typescript', 'eslint')
+
 class VSCodeMemoryMonitor:
     def __init__(self):
         self.memory_threshold = 80  # 記憶體使用率閾值（%）
@@ -33,15 +36,16 @@ class VSCodeMemoryMonitor:
     def get_vscode_processes(self):
         """獲取所有VS Code相關進程"""
         vscode_processes = []
-        keywords = ['code-server', 'node', 'copilot', 'typescript', 'eslint']
         
         for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'memory_info', 'memory_percent', 'create_time']):
             try:
                 pinfo = proc.info
                 cmdline = ' '.join(pinfo['cmdline']) if pinfo['cmdline'] else ''
                 
-                # 檢查是否為VS Code相關進程
-                if any(keyword in cmdline.lower() or keyword in pinfo['name'].lower() for keyword in keywords):
+                # 檢查是否為VS Code相關進程（小寫轉換只做一次，不在每個關鍵字重複）
+                cmdline_lower = cmdline.lower()
+                name_lower = pinfo['name'].lower()
+                if any(keyword in cmdline_lower or keyword in name_lower for keyword in VSCODE_KEYWORDS):
                     memory_mb = pinfo['memory_info'].rss / (1024 * 1024)
                     vscode_processes.append({
                         'pid': pinfo['pid'],
@@ -71,27 +75,36 @@ class VSCodeMemoryMonitor:
         """清理VS Code進程"""
         vscode_procs = self.get_vscode_processes()
         cleaned = []
+        terminated = []
         
         for proc_info in vscode_procs:
-            proc = proc_info['process']
-            memory_mb = proc_info['memory_mb']
-            
             # 如果記憶體使用超過限制或強制清理
-            if memory_mb > self.vscode_memory_limit or force:
+            if proc_info['memory_mb'] > self.vscode_memory_limit or force:
                 try:
                     # 首先嘗試優雅關閉
-                    proc.terminate()
-                    time.sleep(5)
-                    
-                    # 如果還活著，強制殺死
-                    if proc.is_running():
-                        proc.kill()
-                    
-                    cleaned.append(proc_info)
-                    logging.info(f"清理進程: PID {proc_info['pid']}, 記憶體: {memory_mb:.1f}MB")
-                    
+                    proc_info['process'].terminate()
+                    terminated.append(proc_info)
                 except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
-                    logging.warning(f"無法清理進程 {proc_info['pid']}: {e}")
+                    logging.warning("無法清理進程 %s: %s", proc_info['pid'], e)
+        
+        if not terminated:
+            return cleaned
+        
+        # 所有進程共用同一段等待時間，而非每個進程各等 5 秒
+        _, alive = psutil.wait_procs([proc_info['process'] for proc_info in terminated], timeout=5)
+        alive = set(alive)
+        
+        for proc_info in terminated:
+            try:
+                # 如果還活著，強制殺死
+                if proc_info['process'] in alive:
+                    proc_info['process'].kill()
+                
+                cleaned.append(proc_info)
+                logging.info("清理進程: PID %s, 記憶體: %.1fMB", proc_info['pid'], proc_info['memory_mb'])
+                
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                logging.warning("無法清理進程 %s: %s", proc_info['pid'], e)
         
         return cleaned
     
@@ -109,7 +122,7 @@ class VSCodeMemoryMonitor:
                 logging.info("未找到 code-server 服務，僅清理進程")
                 
         except subprocess.CalledProcessError as e:
-            logging.error(f"重啟VS Code Server失敗: {e}")
+            logging.error("重啟VS Code Server失敗: %s", e)
     
     def monitor_loop(self):
         """主監控循環"""
@@ -124,13 +137,14 @@ class VSCodeMemoryMonitor:
                 total_vscode_memory = sum(proc['memory_mb'] for proc in vscode_procs)
                 
                 # 記錄狀態
-                logging.info(f"系統記憶體: {sys_memory['used_gb']:.2f}GB/{sys_memory['total_gb']:.2f}GB ({sys_memory['percent']:.1f}%)")
-                logging.info(f"VS Code進程數: {len(vscode_procs)}, 總記憶體: {total_vscode_memory:.1f}MB")
+                logging.info("系統記憶體: %.2fGB/%.2fGB (%.1f%%)",
+                             sys_memory['used_gb'], sys_memory['total_gb'], sys_memory['percent'])
+                logging.info("VS Code進程數: %d, 總記憶體: %.1fMB", len(vscode_procs), total_vscode_memory)
                 
                 # 詳細記錄大記憶體進程
                 for proc in vscode_procs[:5]:  # 顯示前5個最大的進程
                     if proc['memory_mb'] > 100:  # 只顯示超過100MB的
-                        logging.info(f"  PID {proc['pid']}: {proc['name']} - {proc['memory_mb']:.1f}MB")
+                        logging.info("  PID %s: %s - %.1fMB", proc['pid'], proc['name'], proc['memory_mb'])
                 
                 # 檢查是否需要清理
                 cleanup_needed = False
@@ -150,11 +164,11 @@ class VSCodeMemoryMonitor:
                 
                 # 執行清理
                 if cleanup_needed:
-                    logging.warning(f"觸發清理: {cleanup_reason}")
+                    logging.warning("觸發清理: %s", cleanup_reason)
                     cleaned = self.cleanup_vscode_processes()
                     
                     if cleaned:
-                        logging.info(f"已清理 {len(cleaned)} 個進程")
+                        logging.info("已清理 %d 個進程", len(cleaned))
                         time.sleep(10)  # 等待進程清理完成
                         
                         # 如果系統記憶體仍然很高，考慮重啟VS Code Server
@@ -165,7 +179,7 @@ class VSCodeMemoryMonitor:
                 time.sleep(self.check_interval)
                 
             except Exception as e:
-                logging.error(f"監控循環出錯: {e}")
+                logging.error("監控循環出錯: %s", e)
                 time.sleep(self.check_interval)
     
     def stop(self):
@@ -5,42 +5,76 @@ MCP 監控系統 Web 伺服器
 """
 
 from http.server import HTTPServer, BaseHTTPRequestHandler
+from datetime import datetime
+from operator import itemgetter
+import hashlib
+import heapq
 import json
 import urllib.parse
+import socket
 import subprocess
-import sys
+import traceback
 import os
+import time
 
-# 確保可以導入 MCP 模組
-sys.path.insert(0, '/home/bao/mcp_use')
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
-class MCPWebHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        """處理 GET 請求"""
-        parsed_url = urllib.parse.urlparse(self.path)
-        path = parsed_url.path
-        query = urllib.parse.parse_qs(parsed_url.query)
-        
-        if path == '/':
-            self.serve_dashboard()
-        elif path == '/api/system':
-            self.serve_system_info()
-        elif path == '/api/processes':
-            self.serve_process_info()
-        elif path == '/api/network':
-            self.serve_network_info()
-        elif path == '/api/logs':
-            self.serve_log_info()
-        elif path == '/api/filesystem':
-            self.serve_filesystem_info()
-        elif path == '/api/services':
-            self.serve_services_info(query)
-        else:
-            self.send_error(404, "Not Found")
-    
-    def serve_dashboard(self):
-        """提供監控儀表板"""
-        html = """
+# 服務列表排序鍵 (每筆服務資料皆包含這些欄位)
+SERVICE_SORT_KEYS = {
+    'cpu': itemgetter('cpu_percent'),
+    'memory': itemgetter('memory_percent'),
+    'name': lambda service: service['name'].lower(),
+    'pid': itemgetter('pid')
+}
+
+# 服務列表排除的系統進程名稱片段（子字串比對）
+SYSTEM_PROCESS_PATTERNS = (
+    'kthreadd', 'ksoftirqd', 'migration', 'watchdog', 'systemd',
+    'kworker', 'rcu_gp', 'rcu_par_gp', 'kcompactd0',
+    'khugepaged', 'kintegrityd', 'kblockd', 'blkcg_punt_bio',
+    'tg3', 'edac-poller', 'devfreq_wq', 'kswapd0', 'khvcd',
+    'scsi_eh_', 'scsi_tmf_', 'usb-storage', 'irq/', 'ktimer'
+)
+
+# 服務列表顯示的進程狀態
+LISTED_SERVICE_STATUSES = ('running', 'sleeping')
+
+# 需要 psutil 的 API 路徑 (未安裝 psutil 時回傳錯誤訊息)
+PSUTIL_ROUTES = frozenset((
+    '/api/system', '/api/processes', '/api/network', '/api/filesystem', '/api/services'
+))
+
+# 系統資訊取樣的快取秒數
+SYSTEM_INFO_TTL = 2.0
+
+# 根目錄磁碟用量變化緩慢，快取較久 (系統資訊與檔案系統 API 共用)
+DISK_USAGE_TTL = 30.0
+
+# 取樣快取: 名稱 -> (到期時間, 資料)
+_sample_cache = {}
+
+# 服務列表追蹤中的進程: PID -> psutil.Process
+# 跨請求沿用同一個 Process 物件，cpu_percent() 即可計算自上次請求以來的使用率
+_tracked_processes = {}
+
+def get_cached_sample(name, ttl, collect):
+    """在 ttl 秒內重複使用同一份取樣結果，過期才重新呼叫 collect()"""
+    now = time.monotonic()
+    entry = _sample_cache.get(name)
+    if entry is None or now >= entry[0]:
+        entry = (now + ttl, collect())
+        _sample_cache[name] = entry
+    return entry[1]
+
+def get_root_disk_usage():
+    """取得根目錄磁碟用量 (DISK_USAGE_TTL 秒內共用同一次 statvfs 結果)"""
+    return get_cached_sample('disk', DISK_USAGE_TTL, lambda: psutil.disk_usage('/'))
+
+# 儀表板頁面為靜態內容，啟動時編碼一次即可重複使用
+DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html lang="zh-TW">
 <head>
@@ -533,44 +567,89 @@ class MCPWebHandler(BaseHTTPRequestHandler):
     </script>
 </body>
 </html>
-        """
+""".encode('utf-8')
+
+def format_create_time(create_timestamp):
+    """安全地格式化進程啟動時間"""
+    try:
+        if create_timestamp:
+            return datetime.fromtimestamp(create_timestamp).strftime('%H:%M:%S')
+    except (OSError, ValueError, TypeError):
+        pass
+    return 'N/A'
+
+# 儀表板頁面內容固定，啟動時計算一次 ETag 即可
+DASHBOARD_ETAG = '"%s"' % hashlib.sha256(DASHBOARD_HTML).hexdigest()[:32]
+
+class MCPWebHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        """處理 GET 請求"""
+        parsed_url = urllib.parse.urlparse(self.path)
+        path = parsed_url.path
+        query = urllib.parse.parse_qs(parsed_url.query)
         
+        if psutil is None and path in PSUTIL_ROUTES:
+            self.send_json_response({'error': 'psutil 模組未安裝'})
+            return
+        
+        if path == '/':
+            self.serve_dashboard()
+        elif path == '/api/system':
+            self.serve_system_info()
+        elif path == '/api/processes':
+            self.serve_process_info()
+        elif path == '/api/network':
+            self.serve_network_info()
+        elif path == '/api/logs':
+            self.serve_log_info()
+        elif path == '/api/filesystem':
+            self.serve_filesystem_info()
+        elif path == '/api/services':
+            self.serve_services_info(query)
+        else:
+            self.send_error(404, "Not Found")
+    
+    def serve_dashboard(self):
+        """提供監控儀表板"""
+        if self.is_not_modified(DASHBOARD_ETAG):
+            return
         self.send_response(200)
         self.send_header('Content-type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(DASHBOARD_HTML)))
+        self.send_header('ETag', DASHBOARD_ETAG)
+        self.send_header('Cache-Control', 'no-cache')
         self.end_headers()
-        self.wfile.write(html.encode('utf-8'))
+        self.wfile.write(DASHBOARD_HTML)
     
     def serve_system_info(self):
         """提供系統資訊 API"""
         try:
-            import psutil
-            
-            # 獲取系統資訊
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            load_avg = psutil.getloadavg() if hasattr(psutil, 'getloadavg') else [0, 0, 0]
-            
-            data = {
-                'cpu_percent': round(cpu_percent, 2),
-                'memory_percent': round(memory.percent, 2),
-                'disk_percent': round((disk.used / disk.total) * 100, 2),
-                'load_avg': f"{load_avg[0]:.2f}, {load_avg[1]:.2f}, {load_avg[2]:.2f}",
-                'timestamp': self.get_timestamp()
-            }
-            
+            # 多個用戶端同時輪詢時，在 TTL 內共用同一份取樣
+            data = get_cached_sample('system', SYSTEM_INFO_TTL, self.collect_system_info)
             self.send_json_response(data)
-        except ImportError:
-            self.send_json_response({'error': 'psutil 模組未安裝'})
         except Exception as e:
             print(f"系統資訊錯誤: {e}")
             self.send_json_response({'error': f'系統資訊獲取失敗: {str(e)}'})
     
+    def collect_system_info(self):
+        """取樣系統資源使用率"""
+        # 獲取系統資訊 (非阻塞：回傳自上次呼叫以來的平均 CPU 使用率)
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk = get_root_disk_usage()
+        load_avg = psutil.getloadavg() if hasattr(psutil, 'getloadavg') else [0, 0, 0]
+        
+        return {
+            'cpu_percent': round(cpu_percent, 2),
+            'memory_percent': round(memory.percent, 2),
+            'disk_percent': round((disk.used / disk.total) * 100, 2),
+            'load_avg': f"{load_avg[0]:.2f}, {load_avg[1]:.2f}, {load_avg[2]:.2f}",
+            'timestamp': self.get_timestamp()
+        }
+    
     def serve_process_info(self):
         """提供進程資訊 API"""
         try:
-            import psutil
-            
             processes = list(psutil.process_iter(['status']))
             status_count = {}
             
@@ -596,8 +675,6 @@ class MCPWebHandler(BaseHTTPRequestHandler):
     def serve_network_info(self):
         """提供網路資訊 API"""
         try:
-            import psutil
-            
             net_io = psutil.net_io_counters()
             interfaces = psutil.net_if_addrs()
             connections = len(psutil.net_connections())
@@ -617,9 +694,7 @@ class MCPWebHandler(BaseHTTPRequestHandler):
     def serve_filesystem_info(self):
         """提供檔案系統資訊 API"""
         try:
-            import psutil
-            
-            disk = psutil.disk_usage('/')
+            disk = get_root_disk_usage()
             
             data = {
                 'monitored_paths': '/home,/var/log,/etc',
@@ -647,10 +722,6 @@ class MCPWebHandler(BaseHTTPRequestHandler):
     def serve_services_info(self, query):
         """提供服務資訊 API"""
         try:
-            import psutil
-            from datetime import datetime
-            import time
-            
             # 獲取查詢參數
             sort_by = query.get('sort', ['cpu'])[0]
             desc_order = query.get('desc', ['true'])[0].lower() == 'true'
@@ -659,80 +730,75 @@ class MCPWebHandler(BaseHTTPRequestHandler):
             
             services = []
             
-            # 系統進程黑名單（更完整的過濾列表）
-            system_processes = {
-                'kthreadd', 'ksoftirqd', 'migration', 'watchdog', 'systemd',
-                'kworker', 'ksoftirqd', 'rcu_gp', 'rcu_par_gp', 'kcompactd0',
-                'khugepaged', 'kintegrityd', 'kblockd', 'blkcg_punt_bio',
-                'tg3', 'edac-poller', 'devfreq_wq', 'kswapd0', 'khvcd',
-                'scsi_eh_', 'scsi_tmf_', 'usb-storage', 'irq/', 'ktimer'
-            }
-            
-            # 第一次遍歷：啟動 CPU 監控
+            # 第一次遍歷：篩選進程，沿用前次請求的 Process 物件 (保留 CPU 基準樣本)
+            primed_new = False
+            tracked_now = {}
             process_list = []
             for proc in psutil.process_iter(['pid', 'name', 'status']):
                 try:
                     pinfo = proc.info
-                    if (pinfo['status'] in ['running', 'sleeping'] and 
+                    if (pinfo['status'] in LISTED_SERVICE_STATUSES and 
                         pinfo['name'] and 
-                        not any(sys_proc in pinfo['name'] for sys_proc in system_processes)):
+                        not any(sys_proc in pinfo['name'] for sys_proc in SYSTEM_PROCESS_PATTERNS)):
                         
-                        # 啟動 CPU 監控（不阻塞）
-                        try:
-                            proc.cpu_percent()
-                        except (psutil.NoSuchProcess, psutil.AccessDenied):
-                            pass
-                        process_list.append(proc)
+                        tracked = _tracked_processes.get(pinfo['pid'])
+                        # Process 以 (pid, 建立時間) 比較，PID 被重複使用時視為新進程
+                        if tracked is None or tracked != proc:
+                            # 新進程：啟動 CPU 監控（不阻塞）
+                            try:
+                                proc.cpu_percent()
+                            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                                pass
+                            tracked = proc
+                            primed_new = True
+                        tracked_now[pinfo['pid']] = tracked
+                        process_list.append((tracked, pinfo))
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                     continue
             
-            # 短暫等待以獲得有意義的 CPU 數據
-            time.sleep(0.1)
+            # 只保留仍存在的進程，已結束的進程隨之淘汰
+            _tracked_processes.clear()
+            _tracked_processes.update(tracked_now)
+            
+            # 有新進程剛建立基準樣本時，短暫等待以獲得有意義的 CPU 數據
+            # (否則新出現的高負載進程會顯示 0%)；沿用的進程則取得自上次請求以來的使用率
+            if primed_new:
+                time.sleep(0.1)
             
             # 第二次遍歷：收集完整數據
-            for proc in process_list:
+            for proc, pinfo in process_list:
                 try:
-                    # 安全地獲取進程資訊
-                    pinfo = proc.as_dict(attrs=['pid', 'name', 'status', 'memory_percent', 'memory_info', 'create_time'])
-                    
-                    # 獲取 CPU 使用率（非阻塞）
-                    try:
-                        cpu_percent = proc.cpu_percent()
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        cpu_percent = 0.0
-                    
-                    # 安全地格式化啟動時間
-                    try:
-                        if pinfo['create_time']:
-                            create_time = datetime.fromtimestamp(pinfo['create_time']).strftime('%H:%M:%S')
-                        else:
-                            create_time = 'N/A'
-                    except (OSError, ValueError, TypeError):
-                        create_time = 'N/A'
-                    
-                    # 安全地獲取記憶體資訊
-                    memory_rss = 0
-                    try:
-                        if pinfo['memory_info'] and hasattr(pinfo['memory_info'], 'rss'):
-                            memory_rss = pinfo['memory_info'].rss
-                    except (AttributeError, TypeError):
-                        memory_rss = 0
-                    
-                    # 安全地獲取記憶體百分比
-                    memory_percent = 0.0
-                    try:
-                        memory_percent = float(pinfo['memory_percent'] or 0)
-                    except (TypeError, ValueError):
-                        memory_percent = 0.0
+                    # pid/name/status 已於第一次遍歷取得，其餘欄位在 oneshot 內直接讀取
+                    with proc.oneshot():
+                        # 獲取 CPU 使用率（非阻塞）
+                        try:
+                            cpu_percent = proc.cpu_percent()
+                        except (psutil.NoSuchProcess, psutil.AccessDenied):
+                            cpu_percent = 0.0
+                        
+                        # 無權限讀取的欄位使用預設值，進程仍列出 (與 as_dict 的 None 佔位行為一致)
+                        try:
+                            memory_rss = proc.memory_info().rss
+                        except (psutil.AccessDenied, psutil.ZombieProcess):
+                            memory_rss = 0
+                        try:
+                            memory_percent = proc.memory_percent()
+                        except (psutil.AccessDenied, psutil.ZombieProcess):
+                            memory_percent = 0.0
+                        try:
+                            create_timestamp = proc.create_time()
+                        except (psutil.AccessDenied, psutil.ZombieProcess):
+                            create_timestamp = None
                     
+                    # 啟動時間先保留原始時間戳，只格式化最後回傳的項目
                     service_info = {
                         'pid': pinfo['pid'],
-                        'name': pinfo['name'] or 'Unknown',
+                        'name': pinfo['name'],
                         'status': pinfo['status'],
                         'cpu_percent': float(cpu_percent),
-                        'memory_percent': memory_percent,
+                        'memory_percent': float(memory_percent),
                         'memory_rss': memory_rss,
-                        'create_time': create_time
+                        'create_time': create_timestamp
                     }
                     
                     # 如果啟用隱藏閒置服務，檢查是否為閒置服務
@@ -748,27 +814,28 @@ class MCPWebHandler(BaseHTTPRequestHandler):
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, Exception):
                     continue
             
-            # 排序服務列表
+            # 記錄總數量
+            total_available = len(services)
+            
+            # 排序服務列表；有筆數限制時只挑出前 limit 筆，不必整份排序
             try:
-                if sort_by == 'cpu':
-                    services.sort(key=lambda x: x.get('cpu_percent', 0), reverse=desc_order)
-                elif sort_by == 'memory':
-                    services.sort(key=lambda x: x.get('memory_percent', 0), reverse=desc_order)
-                elif sort_by == 'name':
-                    services.sort(key=lambda x: x.get('name', '').lower(), reverse=desc_order)
-                elif sort_by == 'pid':
-                    services.sort(key=lambda x: x.get('pid', 0), reverse=desc_order)
+                sort_key = SERVICE_SORT_KEYS.get(sort_by)
+                if sort_key and 0 < limit < total_available:
+                    select = heapq.nlargest if desc_order else heapq.nsmallest
+                    services = select(limit, services, key=sort_key)
+                elif sort_key:
+                    services.sort(key=sort_key, reverse=desc_order)
             except Exception as e:
                 # 如果排序失敗，使用預設排序
-                services.sort(key=lambda x: x.get('cpu_percent', 0), reverse=True)
-            
-            # 記錄總數量
-            total_available = len(services)
+                services.sort(key=SERVICE_SORT_KEYS['cpu'], reverse=True)
             
             # 根據設定限制顯示筆數
             if limit > 0:
                 services = services[:limit]
             
+            for service in services:
+                service['create_time'] = format_create_time(service['create_time'])
+            
             data = {
                 'services': services,
                 'total_count': len(services),
@@ -782,32 +849,43 @@ class MCPWebHandler(BaseHTTPRequestHandler):
             
             self.send_json_response(data)
             
-        except ImportError:
-            self.send_json_response({'error': 'psutil 模組未安裝'})
         except Exception as e:
-            import traceback
             error_detail = f"服務監控錯誤: {str(e)}\n{traceback.format_exc()}"
             print(error_detail)  # 記錄到控制台
             self.send_json_response({'error': f'服務監控發生錯誤: {str(e)}'})
     
     def send_json_response(self, data):
         """發送 JSON 回應"""
+        # 回應內容皆由本模組組裝，略過循環參照檢查
+        # API 資料每次輪詢皆含新的時間戳記，不提供 ETag 重新驗證
+        body = json.dumps(data, ensure_ascii=False, check_circular=False).encode('utf-8')
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        self.wfile.write(body)
+
+    def is_not_modified(self, etag):
+        """用戶端快取仍有效時回應 304 (不傳送內容)"""
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        if etag not in tags and '*' not in tags:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        return True
     
     def get_timestamp(self):
         """獲取當前時間戳"""
-        from datetime import datetime
         return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
 def run_server(port=8003):
     """啟動 Web 伺服器"""
-    import socket
-    import time
-    
     # 檢查並清理可能的殭屍進程
     try:
         # 嘗試綁定埠來檢查是否可用
@@ -818,13 +896,12 @@ def run_server(port=8003):
     except OSError as e:
         if e.errno == 98:  # Address already in use
             print(f"埠 {port} 已被佔用，嘗試尋找並終止相關進程...")
-            import subprocess
             try:
                 # 查找佔用埠的進程
                 result = subprocess.run(['lsof', '-ti', f':{port}'], 
                                       capture_output=True, text=True)
-                if result.stdout.strip():
-                    pids = result.stdout.strip().split('\n')
+                pids = result.stdout.split()
+                if pids:
                     for pid in pids:
                         try:
                             subprocess.run(['kill', '-9', pid], check=True)
@@ -835,6 +912,10 @@ def run_server(port=8003):
             except FileNotFoundError:
                 print("lsof 命令未找到，請手動檢查埠使用情況")
     
+    # 預先取樣一次 CPU 使用率，讓之後的非阻塞取樣有比較基準
+    if psutil is not None:
+        psutil.cpu_percent(interval=None)
+    
     try:
         server_address = ('', port)
         httpd = HTTPServer(server_address, MCPWebHandler)